@@ -2,11 +2,11 @@
 # PySide6 desktop UI — Windows-ready, dark-theme default, true pill buttons, aligned inputs/buttons.
 # pip install PySide6 python-docx lxml
 
-import sys, re, os, unicodedata
+import sys, re, os, io, json, time, hashlib, zipfile, unicodedata, copy, functools
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from lxml import etree
-from docx import Document
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, Signal
 from PySide6.QtGui import QFont, QKeySequence, QAction
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
@@ -25,34 +25,61 @@ NSMAP = {
 # Low-level helpers
 # ----------------------
 
-def paragraph_full_text(paragraph):
+W_T = '{%s}t' % NSMAP['w']
+W_BR = '{%s}br' % NSMAP['w']
+M_T = '{%s}t' % NSMAP['m']
+
+def paragraph_full_text(p):
     """
     Reconstruct paragraph text by iterating runs and math nodes in order.
     This preserves OMath content (extracts m:t text) and normal text.
+    Works on the <w:p> element in place (no serialise/re-parse, no python-docx wrappers).
     """
-    xml = paragraph._p.xml.encode("utf-8")
-    root = etree.fromstring(xml)
     pieces = []
-    for child in root:
-        tag = etree.QName(child.tag).localname
+    for child in p:
+        tag = etree.QName(child).localname
         if tag == "r":  # run
-            for t in child.findall('.//w:t', namespaces=NSMAP):
+            for t in child.iterdescendants(W_T):
                 if t.text:
                     pieces.append(t.text)
             # preserve explicit breaks
-            if child.findall('.//w:br', namespaces=NSMAP):
+            if next(child.iterdescendants(W_BR), None) is not None:
                 pieces.append('\n')
         elif tag in ("oMath", "oMathPara"):
             # gather math text tokens
-            for mt in child.findall('.//m:t', namespaces=NSMAP):
+            for mt in child.iterdescendants(M_T):
                 if mt.text:
                     pieces.append(mt.text)
         else:
             # fallback: any w:t deeper in this node
-            for t in child.findall('.//w:t', namespaces=NSMAP):
+            for t in child.iterdescendants(W_T):
                 if t.text:
                     pieces.append(t.text)
-    return "".join([p if p is not None else "" for p in pieces]).strip()
+    return "".join(pieces).strip()
+
+W_P = '{%s}p' % NSMAP['w']
+W_BODY = '{%s}body' % NSMAP['w']
+W_R = '{%s}r' % NSMAP['w']
+
+def iter_body_paragraph_texts(data):
+    """
+    Yield the text of each top-level body paragraph (what doc.paragraphs covers), streamed
+    from word/document.xml with iterparse. Paragraphs are freed as soon as they are read,
+    so the whole python-docx tree is never built.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as z, z.open('word/document.xml') as f:
+        for _, elem in etree.iterparse(f, events=('end',), tag=W_P):
+            parent = elem.getparent()
+            if parent is None or parent.tag != W_BODY:
+                continue  # table cells, text boxes etc.
+            yield paragraph_full_text(elem)
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+_NEWLINE_RE = re.compile(r'\r\n|\r')
+_BLANK_LINES_RE = re.compile(r'\n\s+\n')
+_SPACES_RE = re.compile(r'[ \t]+')
 
 def normalize_text(s):
     """Unicode NFC and collapse whitespace, remove zero-width chars."""
@@ -60,16 +87,17 @@ def normalize_text(s):
         return ""
     s = unicodedata.normalize("NFC", s)
     s = s.replace('\u200b', '').replace('\u200c', '').replace('\u200d', '')
-    s = re.sub(r'\r\n|\r', '\n', s)
-    s = re.sub(r'\n\s+\n', '\n\n', s)
-    s = re.sub(r'[ \t]+', ' ', s)
+    s = _NEWLINE_RE.sub('\n', s)
+    s = _BLANK_LINES_RE.sub('\n\n', s)
+    s = _SPACES_RE.sub(' ', s)
     return s.strip()
 
 # ----------------------
 # Parsing algorithm
 # ----------------------
 
-SEPARATOR_RE = re.compile(r'^[\-\—\–\*\_]{1,}\s*$')
+# A (stripped) paragraph made up only of these characters separates question blocks
+SEPARATOR_CHARS = '-—–*_'
 
 HEADING_PATTERNS = [
     r'^unique questions',
@@ -79,27 +107,24 @@ HEADING_PATTERNS = [
     r'^selected questions with answers',
     r'^questions? on',
 ]
+# One alternation instead of a match per pattern (r'^paper\s*\d+\b' is covered by r'^paper\s*\d+')
+HEADING_RE = re.compile("|".join(HEADING_PATTERNS))
 
 def is_heading_line(line: str) -> bool:
     if not line:
         return False
     ln = line.strip().lower()
-    for pat in HEADING_PATTERNS:
-        if re.match(pat, ln):
-            return True
-    if 'unique questions' in ln or 'answers and explanations' in ln:
-        return True
-    if re.match(r'^paper\s*\d+\b', ln):
-        return True
-    return False
+    return (HEADING_RE.match(ln) is not None
+            or 'unique questions' in ln or 'answers and explanations' in ln)
 
 def group_paragraphs_into_blocks(paragraphs):
+    # paragraph_full_text already returns stripped text, so it isn't stripped again here
     blocks = []
     curr = []
     for p in paragraphs:
         if p is None:
             continue
-        if p.strip() == "" or SEPARATOR_RE.match(p.strip()):
+        if not p.strip(SEPARATOR_CHARS):
             if curr:
                 blocks.append(curr)
                 curr = []
@@ -109,6 +134,21 @@ def group_paragraphs_into_blocks(paragraphs):
         blocks.append(curr)
     return blocks
 
+# Patterns used by parse_block, compiled once
+EXPLANATION_RE = re.compile(r'(?i)\b(Explanation|Solution|Explanatory)\b\s*[:\-]?\s*(.*)$', flags=re.S)
+ANSWER_RE = re.compile(r'(?i)\b(Answer|Ans|Correct|Key|Correct option)\b\s*[:\-]?\s*([^\n\r]*)')
+ANSWER_LETTER_RE = re.compile(r'([A-Da-d])')
+OPTIONS_TOKEN_RE = re.compile(r'(?i)\bOptions?\b\s*[:\-]?\s*(.*)$', flags=re.S)
+FIRST_OPTION_SPLIT_RE = re.compile(r'(?=(?:\(|\[)?[A-Da-d][\)\].]?\s+)')
+OPTION_LINE_RE = re.compile(r'^\s*[\(\[]?([A-Da-d])[\)\].]?\s*(.+)')
+OPTION_PAIR_RE = re.compile(
+    r'[\(\[]?([A-Da-d])[\)\].]?\s*'          # label
+    r'([^(\(\[]+?)'                          # option text (lazy)
+    r'(?=(?:[\(\[]?[A-Da-d][\)\].]?|\Z))',   # until next label or end
+    flags=re.S
+)
+INLINE_OPTION_SPLIT_RE = re.compile(r'[\s]*[A-Da-d][\)\.\]]\s*')
+
 # Core block parsing
 def parse_block(block, idx):
     """
@@ -130,7 +170,11 @@ def parse_block(block, idx):
 
     # extract explanation at end, if exists
     explanation = ""
-    m_expl = re.search(r'(?i)\b(Explanation|Solution|Explanatory)\b\s*[:\-]?\s*(.*)$', raw, flags=re.S)
+    # Cheap substring tests first: each regex below can only match if its keyword occurs.
+    # (casefold() maps every character the (?i) patterns treat as equal to these letters; the
+    # fragments avoid 'i', whose dotted/dotless forms are the one exception.)
+    low = raw.casefold()
+    m_expl = EXPLANATION_RE.search(raw) if ('explanat' in low or 'solut' in low) else None
     if m_expl:
         explanation = m_expl.group(2).strip()
         raw = raw[:m_expl.start()].strip()
@@ -138,31 +182,31 @@ def parse_block(block, idx):
     # extract answer if present anywhere (prefer before options split)
     raw_answer_text = None
     answer_letter = None
-    m_ans = re.search(r'(?i)\b(Answer|Ans|Correct|Key|Correct option)\b\s*[:\-]?\s*([^\n\r]*)', raw)
+    m_ans = ANSWER_RE.search(raw) if ('ans' in low or 'correct' in low or 'key' in low) else None
     if m_ans:
         raw_answer_text = m_ans.group(2).strip()
         raw = raw[:m_ans.start()].strip()
-        m_letter = re.search(r'([A-Da-d])', raw_answer_text)
+        m_letter = ANSWER_LETTER_RE.search(raw_answer_text)
         if m_letter:
             answer_letter = m_letter.group(1).lower()
 
     # split question vs options
     question_text = raw
     options_part = ""
-    m_options_token = re.search(r'(?i)\bOptions?\b\s*[:\-]?\s*(.*)$', raw, flags=re.S)
+    m_options_token = OPTIONS_TOKEN_RE.search(raw) if 'opt' in low else None
     if m_options_token:
         question_text = raw[:m_options_token.start()].strip()
         options_part = m_options_token.group(1).strip()
     else:
         # attempt split before first labeled option (a) or a. etc
-        sp = re.split(r'(?=(?:\(|\[)?[A-Da-d][\)\].]?\s+)', raw, maxsplit=1)
+        sp = FIRST_OPTION_SPLIT_RE.split(raw, maxsplit=1)
         if len(sp) == 2:
             question_text, options_part = sp[0].strip(), sp[1].strip()
         else:
             # maybe options are on separate paragraphs - gather lines starting with a., (a) etc
             separate_opts = []
             for p in paras[1:]:
-                m = re.match(r'^\s*[\(\[]?([A-Da-d])[\)\].]?\s*(.+)', p)
+                m = OPTION_LINE_RE.match(p)
                 if m:
                     separate_opts.append((m.group(1).lower(), m.group(2).strip()))
             if separate_opts:
@@ -172,12 +216,7 @@ def parse_block(block, idx):
                 question_text = paras[0].strip()
 
     # extract pairs label -> text using robust regex
-    opt_pairs = re.findall(
-        r'[\(\[]?([A-Da-d])[\)\].]?\s*'          # label
-        r'([^(\(\[]+?)'                          # option text (lazy)
-        r'(?=(?:[\(\[]?[A-Da-d][\)\].]?|\Z))',   # until next label or end
-        options_part, flags=re.S
-    )
+    opt_pairs = OPTION_PAIR_RE.findall(options_part)
     opts = []
     if opt_pairs:
         # sort by label order a..d
@@ -186,26 +225,19 @@ def parse_block(block, idx):
             opts.append(normalize_text(label_map.get(label, "")))
     else:
         # fallback: try to find inline 'a) text b) text' by splitting tokens
-        inline = re.split(r'[\s]*[A-Da-d][\)\.\]]\s*', options_part)
-        inline = [normalize_text(x) for x in inline if normalize_text(x)]
-        if inline:
-            # note: the split yields leading prefix before first label; to be safe, take last 4
-            if len(inline) >= 4:
-                opts = inline[:4]
-            else:
-                opts = inline + [""] * (4 - len(inline))
-        else:
-            opts = ["", "", "", ""]
+        inline = INLINE_OPTION_SPLIT_RE.split(options_part)
+        inline = [x for x in map(normalize_text, inline) if x]
+        # padded/truncated to four below
+        opts = inline
 
-    # ensure 4 options
-    if len(opts) < 4:
-        opts += [""] * (4 - len(opts))
-    if len(opts) > 4:
-        opts = opts[:4]
+    # ensure exactly 4 options (pad and truncate in one step)
+    opts = (opts + ["", "", "", ""])[:4]
 
     # try to resolve answer by matching raw_answer_text against options if letter unknown
     assumed = False
     if not answer_letter and raw_answer_text:
+        # containment, not equality ("Ans: (b) 42 metres" vs option "42 metres"), so this stays
+        # a scan over the four options rather than a dict probe
         ra = raw_answer_text.lower()
         for i, o in enumerate(opts):
             if o and o.lower() in ra:
@@ -239,26 +271,64 @@ def parse_block(block, idx):
         return None
     return parsed
 
+# Parsed results are cached by a hash of the input bytes, so converting the same file again
+# skips the unzip/XML/regex work. Bump PARSER_VERSION when parse_block's output changes.
+PARSE_CACHE_DIR = Path.home() / ".cache" / "quizformatter" / "parsed"
+PARSER_VERSION = 1
+PARSE_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds; older entries are pruned when a new one is stored
+PARALLEL_MIN_BLOCKS = 20000  # below this, parsing in-process is faster than starting worker processes
+
+def _load_cached_parse(cache_file):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(cache_file)  # entries still in use are not pruned as stale
+    except OSError:
+        pass
+    return questions
+
+def _store_cached_parse(cache_file, questions):
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".part")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(questions, f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+        cutoff = time.time() - PARSE_CACHE_MAX_AGE
+        for entry in os.scandir(cache_file.parent):
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    except OSError:
+        pass  # the cache is only an optimisation
+
 def parse_docx_to_questions(input_path, write_debug_log=True):
     """
     Parses the input docx and returns a list of parsed question dicts.
     Also writes debug_log.jsonl if write_debug_log True.
     """
-    doc = Document(input_path)
-    paragraphs = [paragraph_full_text(p) for p in doc.paragraphs]
-    blocks = group_paragraphs_into_blocks(paragraphs)
-    questions = []
-    debug_entries = []
-    for i, block in enumerate(blocks):
-        q = parse_block(block, i)
-        if q:
-            questions.append(q)
-            debug_entries.append(q['debug'])
+    data = Path(input_path).read_bytes()
+    key = hashlib.sha256(b"%d|" % PARSER_VERSION + data).hexdigest()
+    cache_file = PARSE_CACHE_DIR / f"{key}.json"
+    questions = _load_cached_parse(cache_file)
+    if questions is None:
+        blocks = group_paragraphs_into_blocks(iter_body_paragraph_texts(data))
+        if len(blocks) >= PARALLEL_MIN_BLOCKS:
+            # blocks are independent; worker start-up (a module re-import per process on Windows)
+            # only pays off for very large files
+            with ProcessPoolExecutor() as ex:
+                parsed = list(ex.map(parse_block, blocks, range(len(blocks)), chunksize=256))
+        else:
+            parsed = [parse_block(block, i) for i, block in enumerate(blocks)]
+        questions = [q for q in parsed if q]
+        _store_cached_parse(cache_file, questions)
     if write_debug_log:
         try:
             with open("debug_log.jsonl", "w", encoding="utf-8") as f:
-                for e in debug_entries:
-                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                for q in questions:
+                    f.write(json.dumps(q['debug'], ensure_ascii=False) + "\n")
         except Exception as e:
             # ignore write debug errors; not critical
             pass
@@ -268,54 +338,120 @@ def parse_docx_to_questions(input_path, write_debug_log=True):
 # Output builder
 # ----------------------
 
-def write_output_docx(questions, output_path):
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+RUN_SPECIAL_RE = re.compile(r'([\t\r\n])')
+
+def _append_run_text(r, text):
+    """Append text to a <w:r> the way python-docx's `run.text = ...` does (tabs, line breaks, xml:space)."""
+    for piece in RUN_SPECIAL_RE.split(text):
+        if not piece:
+            continue
+        if piece == '\t':
+            r.append(OxmlElement('w:tab'))
+        elif piece in '\r\n':
+            r.append(OxmlElement('w:br'))
+        else:
+            t = OxmlElement('w:t')
+            t.text = piece
+            if piece != piece.strip():
+                t.set(XML_SPACE, 'preserve')
+            r.append(t)
+
+ANSWER_INDEX = {'a':0,'b':1,'c':2,'d':3}
+
+# python-docx is only needed by the writer, so it is imported on the first conversion
+# rather than delaying the window (and every parse worker process) at start-up.
+Document = OxmlElement = qn = CT_Tbl = Table = None  # set by _load_docx()
+
+@functools.lru_cache(maxsize=1)
+def _load_docx():
+    global Document, OxmlElement, qn, CT_Tbl, Table
+    from docx import Document
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.oxml.table import CT_Tbl
+    from docx.table import Table
+
+_TABLE_TEMPLATE = None  # (<w:tbl>, positions of the per-question runs); built on first use
+
+def _table_template(doc):
     """
-    Write the exact required table per question:
-    8 rows x 3 cols:
-    Row0: cell(0,0) = 'Question', cell(0,1)+cell(0,2) merged -> question text
-    Row1: cell(1,0) = 'Type', merge cell(1,1..2) -> 'multiple_choice'
-    Row2-5: each row: 'Option' | option text | correct/incorrect
-    Row6: 'Solution' | merge cell(6,1..2) -> explanation
-    Row7: 'Marks' | '1' | '0'
+    Build the question table once with python-docx, leaving the per-question cells empty.
+    Each question then deep-copies it and fills those runs, instead of ~20 cell.text writes.
     """
-    doc = Document()
-    for q in questions:
-        table = doc.add_table(rows=8, cols=3)
+    global _TABLE_TEMPLATE
+    if _TABLE_TEMPLATE is None:
+        section = doc.sections[-1]
+        width = section.page_width - section.left_margin - section.right_margin
+        tbl = CT_Tbl.new_tbl(8, 3, width)
+        table = Table(tbl, doc)
         try:
             table.style = 'Table Grid'
         except Exception:
             pass
+        slots = []
 
         # Row0
         table.cell(0,0).text = "Question"
-        table.cell(0,1).merge(table.cell(0,2)).text = q.get('question', '')
+        slots.append(table.cell(0,1).merge(table.cell(0,2)))
 
         # Row1
         table.cell(1,0).text = "Type"
         table.cell(1,1).merge(table.cell(1,2)).text = "multiple_choice"
 
-        # Rows 2-5: Options
-        opts = q.get('options', ['','','',''])
-        letter = q.get('answer','a').lower()
-        idx_map = {'a':0,'b':1,'c':2,'d':3}
-        correct_idx = idx_map.get(letter, 0)
+        # Rows 2-5: Options (text, correct/incorrect)
         for i in range(4):
             r = 2 + i
             table.cell(r,0).text = "Option"
-            table.cell(r,1).text = opts[i] or ""
-            table.cell(r,2).text = "correct" if i==correct_idx else "incorrect"
+            slots += [table.cell(r,1), table.cell(r,2)]
 
         # Row6 solution
         table.cell(6,0).text = "Solution"
-        table.cell(6,1).merge(table.cell(6,2)).text = q.get('explanation','')
+        slots.append(table.cell(6,1).merge(table.cell(6,2)))
 
         # Row7 marks
         table.cell(7,0).text = "Marks"
         table.cell(7,1).text = "1"
         table.cell(7,2).text = "0"
 
+        for cell in slots:
+            cell.text = ""  # leaves one empty run to fill per question
+        runs = list(tbl.iter(W_R))
+        _TABLE_TEMPLATE = (tbl, [runs.index(cell._tc.p_lst[0].r_lst[0]) for cell in slots])
+    return _TABLE_TEMPLATE
+
+def write_output_docx(questions, output_path):
+    """
+    Write the exact required table per question:
+    8 rows x 3 cols:
+    Row0: cell(0,0) = 'Question', cell(0,1)+cell(0,2) merged -> question text
+    Row1: cell(1,0) = 'Type', merge cell(1,1..2) -> 'multiple_choice'
+    Row2-5: each row: 'Option' | option text | correct/incorrect
+    Row6: 'Solution' | merge cell(6,1..2) -> explanation
+    Row7: 'Marks' | '1' | '0'
+    """
+    _load_docx()
+    doc = Document()
+    # Tables and spacer paragraphs go straight in before the body's sectPr. doc.add_table/add_paragraph
+    # search the body from the start for that insertion point on every call (quadratic for long quizzes).
+    sect_pr = doc.element.body.sectPr
+    template, slots = _table_template(doc)
+    for q in questions:
+        opts = q.get('options', ['','','',''])
+        correct_idx = ANSWER_INDEX.get(q.get('answer','a').lower(), 0)
+        values = [q.get('question', '')]
+        for i in range(4):
+            values += [opts[i] or "", "correct" if i==correct_idx else "incorrect"]
+        values.append(q.get('explanation',''))
+
+        tbl = copy.deepcopy(template)
+        runs = list(tbl.iter(W_R))
+        for pos, text in zip(slots, values):
+            _append_run_text(runs[pos], text)
+        sect_pr.addprevious(tbl)
+
         # spacing paragraph
-        doc.add_paragraph()
+        sect_pr.addprevious(OxmlElement('w:p'))
     doc.save(output_path)
 
 # --- Conversion Logic End ---
@@ -466,6 +602,29 @@ QPushButton#reset_btn:hover {
 QFrame { border: none; }
 """
 
+class WorkerSignals(QObject):
+    finished = Signal(list)      # parsed questions
+    error = Signal(str, str)     # dialog title, message
+
+
+class ParseWorker(QRunnable):
+    """Runs parse_docx_to_questions off the GUI thread so the window keeps repainting on big files."""
+
+    def __init__(self, in_path, out_path):
+        super().__init__()
+        self.in_path = in_path
+        self.out_path = out_path
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            questions = parse_docx_to_questions(self.in_path, write_debug_log=True)
+        except Exception as ex:
+            self.signals.error.emit("Parse error", f"Failed to parse input file:\n{ex}")
+            return
+        self.signals.finished.emit(questions)
+
+
 # -------------------- Main Window --------------------
 class QuizFormatterMain(QMainWindow):
     def __init__(self):
@@ -621,6 +780,7 @@ class QuizFormatterMain(QMainWindow):
         # state
         self.current_input_path = None
         self.output_path = None
+        self._parse_worker = None
 
         # default to dark theme as requested
         self.is_dark = True
@@ -725,11 +885,23 @@ class QuizFormatterMain(QMainWindow):
         else:
             out_path = self.current_input_path.parent / (out_name_text or (self.current_input_path.stem + "_Formatted.docx"))
 
-        try:
-            questions = parse_docx_to_questions(self.current_input_path, write_debug_log=True)
-        except Exception as ex:
-            QMessageBox.critical(self, "Parse error", f"Failed to parse input file:\n{ex}")
-            return
+        # parsing runs on the thread pool; the warnings prompt and the save continue in on_parse_finished
+        self.convert_btn.setEnabled(False)
+        worker = ParseWorker(self.current_input_path, out_path)
+        worker.signals.finished.connect(self.on_parse_finished)
+        worker.signals.error.connect(self.on_parse_error)
+        self._parse_worker = worker  # keep the Python wrapper (and its signals) alive while it runs
+        QThreadPool.globalInstance().start(worker)
+
+    def on_parse_error(self, title: str, message: str):
+        self._parse_worker = None
+        self.convert_btn.setEnabled(True)
+        QMessageBox.critical(self, title, message)
+
+    def on_parse_finished(self, questions: list):
+        out_path = self._parse_worker.out_path
+        self._parse_worker = None
+        self.convert_btn.setEnabled(True)
 
         # Check for warnings
         warnings = []
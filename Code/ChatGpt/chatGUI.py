@@ -1,17 +1,42 @@
 # quiz_converter_app_windows_ready.py
 # PySide6 desktop UI — Windows-ready, dark-theme default, true pill buttons, aligned inputs/buttons.
-# pip install PySide6
+# pip install PySide6  (optional: orjson for faster JSON output)
 
-import sys, json, re
+import sys, re, os, mmap
 from pathlib import Path
-from datetime import datetime
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, Signal
 from PySide6.QtGui import QFont, QKeySequence, QAction
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
     QHBoxLayout, QVBoxLayout, QFileDialog, QMessageBox, QFrame, QSizePolicy
 )
 
+# Resolved once; used as the starting folder for the file dialogs.
+HOME_STR = str(Path.home())
+
+# File dialog name filters
+OPEN_FILTER = "Text Files (*.txt *.md);;Word Documents (*.docx);;All Files (*)"
+SAVE_FILTER = "JSON Files (*.json);;All Files (*)"
+
+# ------------ simple_convert patterns ------------
+# One token per non-blank line: question / option / answer, or plain text that
+# continues the previous question or option. Each tail is stripped by the caller.
+# Every branch is a fixed prefix plus `.*` up to the line end, so `re` scans this in
+# linear time. We stay on `re` rather than RE2: RE2's \s / case folding are not
+# Python's Unicode rules, so results could change depending on what is installed.
+_TOKEN_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?P<q>(?:\d+\.|Q:|Question[^\S\n]*[:\-]?)(?P<qt>.*))'
+    r'|(?P<opt>(?:A\.|B\.|C\.|D\.|[A-D]\)|\-|•)(?P<ot>.*))'
+    r'|(?P<ans>(?:Answer[:\-]?|Ans[:\-]?|Correct[:\-]?)(?P<at>.*))'
+    r'|(?P<text>\S.*))',
+    re.IGNORECASE | re.MULTILINE)
+
+# ------------ Fonts ------------
+# Built once and shared by every widget instead of a new QFont per widget / per theme toggle.
+APP_NAME_FONT = QFont("Segoe UI", 30, QFont.Weight.DemiBold)
+LABEL_FONT = QFont("Segoe UI", 13)
+
 # ------------ QSS (light & dark) ------------
 # We keep both in case you want to switch default later.
 DARK_QSS = r"""
@@ -129,6 +154,116 @@ QPushButton#theme_btn {
 QFrame { border: none; }
 """
 
+def _minify_qss(qss: str) -> str:
+    # drop comments and collapse whitespace so Qt's stylesheet parser has less to scan
+    qss = re.sub(r'/\*.*?\*/', '', qss, flags=re.S)
+    return re.sub(r'\s+', ' ', qss).strip()
+
+_DARK_QSS_MIN = _minify_qss(DARK_QSS)
+_LIGHT_QSS_MIN = _minify_qss(LIGHT_QSS)
+
+# -------------------- Background conversion --------------------
+MMAP_THRESHOLD = 1 << 20  # inputs larger than this are mapped instead of read()
+
+def read_input_text(path: Path) -> str:
+    if path.stat().st_size <= MMAP_THRESHOLD:
+        return path.read_text(encoding="utf-8", errors="ignore")
+    # large file: map it read-only and decode from the mapped pages without an intermediate copy
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):  # POSIX only
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            # decode from a view of the mapping; mm[:] would first copy the whole file into a bytes object
+            with memoryview(mm) as mv:
+                text = str(mv, "utf-8", "ignore")
+    finally:
+        os.close(fd)
+    # same universal-newline translation read_text() applies
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+class WorkerSignals(QObject):
+    finished = Signal(str)       # output file name
+    error = Signal(str, str)     # dialog title, message
+
+
+class ConvertWorker(QRunnable):
+    """Reads the input file, parses it with `parse` and writes the JSON payload, off the GUI thread."""
+
+    def __init__(self, in_path, out_path, parse):
+        super().__init__()
+        self.in_path = in_path
+        self.out_path = out_path
+        self.parse = parse
+        self.signals = WorkerSignals()
+
+    def run(self):
+        # imported here rather than at module level to keep them off the startup path
+        import json
+        from datetime import datetime, timezone
+        try:
+            import orjson  # optional: native serializer, much faster than json for big payloads
+        except ImportError:
+            orjson = None
+
+        try:
+            text = read_input_text(self.in_path)
+        except Exception as ex:
+            self.signals.error.emit("Read error", f"Failed to read input file:\n{ex}")
+            return
+
+        try:
+            # ====== PLUG YOUR BACKEND HERE ======
+            # For now we run a simple parser as a placeholder:
+            parsed = self.parse(text)
+            payload = {
+                "sourceFile": str(self.in_path.name),
+                "convertedAt": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+                "converter": "Quiz Converter (Desktop)",
+                "summary": parsed.get("summary", ""),
+                "data": parsed.get("data")
+            }
+            # ====================================
+
+            data = payload["data"]
+            raw_path = None
+            if isinstance(data, dict) and "raw" in data:
+                # raw-text fallback: keep the (possibly huge) text in a sidecar file
+                # instead of JSON-escaping all of it into the payload
+                raw_path = self.out_path.with_name(self.out_path.name + ".raw.txt")
+                raw_tmp = raw_path.with_name(raw_path.name + ".part")
+                try:
+                    raw_tmp.write_text(data["raw"], encoding="utf-8")
+                    os.replace(raw_tmp, raw_path)
+                except Exception:
+                    raw_tmp.unlink(missing_ok=True)
+                    raise
+                payload["data"] = {"rawFile": raw_path.name}
+            # write to a temp file and swap it in, so a failed write never leaves a truncated output
+            tmp_path = self.out_path.with_name(self.out_path.name + ".part")
+            try:
+                if orjson is not None:
+                    tmp_path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+                else:
+                    # stream the encoder's chunks through a large buffer instead of building one big string
+                    with tmp_path.open("w", encoding="utf-8", buffering=1024 * 1024) as f:
+                        for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(payload):
+                            f.write(chunk)
+                os.replace(tmp_path, self.out_path)
+            except Exception:
+                tmp_path.unlink(missing_ok=True)
+                if raw_path is not None:
+                    raw_path.unlink(missing_ok=True)  # don't leave a sidecar without its payload
+                raise
+        except Exception as ex:
+            self.signals.error.emit("Save error", f"Failed to save output file:\n{ex}")
+            return
+        self.signals.finished.emit(self.out_path.name)
+
+
 # -------------------- Main Window --------------------
 class QuizConverterMain(QMainWindow):
     def __init__(self):
@@ -150,8 +285,8 @@ class QuizConverterMain(QMainWindow):
         topbar_layout.setSpacing(8)
 
         self.app_name = QLabel("Quiz Converter", objectName="app_name")
-        # fallback font; QSS will set size, but keep weight
-        self.app_name.setFont(QFont("Segoe UI", 28, QFont.Weight.Bold))
+        # fallback font; QSS will set size, but keep weight (set once — stylesheet changes don't reset it)
+        self.app_name.setFont(APP_NAME_FONT)
         topbar_layout.addWidget(self.app_name, alignment=Qt.AlignLeft | Qt.AlignVCenter)
 
         topbar_layout.addStretch()
@@ -178,6 +313,49 @@ class QuizConverterMain(QMainWindow):
         hwrap = QHBoxLayout()
         hwrap.addStretch()
 
+        # placeholder card (same size/style); the real contents are built after the first show
+        self._card = QFrame(objectName="card")
+        self._card.setFixedWidth(480)
+        self._card_built = False
+        self._hwrap = hwrap
+        hwrap.addWidget(self._card)
+        hwrap.addStretch()
+        content_layout.addLayout(hwrap)
+
+        content_layout.addStretch()
+        main_v.addWidget(content)
+
+        # Toast — created on the first show_toast call
+        self.toast = None
+        self._toast_timer = None
+
+        # state
+        self.current_input_path = None
+        self.output_path = None
+        self._suggested_out_name = None  # "<input stem>-converted", cached on file selection
+        self._convert_worker = None
+        self._open_dlg = None
+        self._save_dlg = None
+        self._last_open_dir = HOME_STR
+        self._last_save_dir = HOME_STR
+
+        # default to dark theme as requested
+        self.is_dark = True
+
+        # Fusion style + the dark stylesheet are set once in main(), before any widget exists.
+        # shortcuts are added on the first event-loop tick so the window paints sooner
+        QTimer.singleShot(0, self._post_show_init)
+
+        # ensure theme button icon matches initial theme
+        self.update_theme_icon()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._card_built:
+            self._card_built = True
+            QTimer.singleShot(0, self._build_card)
+
+    def _build_card(self):
         card = QFrame(objectName="card")
         card.setFixedWidth(480)  # slightly wider for comfortable spacing
         card_layout = QVBoxLayout(card)
@@ -186,7 +364,7 @@ class QuizConverterMain(QMainWindow):
 
         # Input
         lbl_input = QLabel("Input")
-        lbl_input.setFont(QFont("Segoe UI", 13))
+        lbl_input.setFont(LABEL_FONT)
         card_layout.addWidget(lbl_input)
 
         input_line = QWidget(objectName="input_line")
@@ -198,7 +376,7 @@ class QuizConverterMain(QMainWindow):
         # match button height to align perfectly
         self.input_edit.setFixedHeight(36)
         self.input_edit.setReadOnly(True)
-        self.input_edit.setFont(QFont("Segoe UI", 13))
+        self.input_edit.setFont(LABEL_FONT)
         self.input_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
         self.browse_btn = QPushButton("Browse")
@@ -216,7 +394,7 @@ class QuizConverterMain(QMainWindow):
 
         # Output
         lbl_output = QLabel("Output")
-        lbl_output.setFont(QFont("Segoe UI", 13))
+        lbl_output.setFont(LABEL_FONT)
         card_layout.addWidget(lbl_output)
 
         output_line = QWidget(objectName="output_line")
@@ -226,7 +404,7 @@ class QuizConverterMain(QMainWindow):
 
         self.output_edit = QLineEdit(placeholderText="Save as...")
         self.output_edit.setFixedHeight(36)
-        self.output_edit.setFont(QFont("Segoe UI", 13))
+        self.output_edit.setFont(LABEL_FONT)
         self.output_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
         self.save_btn = QPushButton("Save")
@@ -252,56 +430,26 @@ class QuizConverterMain(QMainWindow):
         card_layout.addWidget(self.convert_btn)
 
         card_layout.addStretch()
-        hwrap.addWidget(card)
-        hwrap.addStretch()
-        content_layout.addLayout(hwrap)
-
-        content_layout.addStretch()
-        main_v.addWidget(content)
-
-        # Toast
-        self.toast = QLabel("", objectName="toast")
-        self.toast.setVisible(False)
-        self.toast.setAlignment(Qt.AlignCenter)
-        toast_wrap = QHBoxLayout()
-        toast_wrap.addStretch()
-        toast_wrap.addWidget(self.toast)
-        toast_wrap.addStretch()
-        main_v.addLayout(toast_wrap)
-
-        # state
-        self.current_input_path = None
-        self.output_path = None
-
-        # default to dark theme as requested
-        self.is_dark = True
-
-        # IMPORTANT: use Fusion style so QSS reliably applies across Windows versions
-        app = QApplication.instance()
-        app.setStyle("Fusion")
-        # apply theme (app-level stylesheet) now
-        self.apply_theme()
+        self._hwrap.replaceWidget(self._card, card)
+        self._card.deleteLater()
+        self._card = card
 
+    def _post_show_init(self):
         # shortcuts
         focus_output = QAction(self)
         focus_output.setShortcut(QKeySequence("Ctrl+K"))
         focus_output.triggered.connect(lambda: self.output_edit.setFocus())
         self.addAction(focus_output)
 
-        # ensure theme button icon matches initial theme
-        self.update_theme_icon()
-
     # ---------- Styling helpers ----------
     def apply_theme(self):
         app = QApplication.instance()
         if app is None:
             return
-        if self.is_dark:
-            app.setStyleSheet(DARK_QSS)
-        else:
-            app.setStyleSheet(LIGHT_QSS)
-        # ensure app-name weight & font stays strong
-        self.app_name.setFont(QFont("Segoe UI", 30, QFont.Weight.DemiBold))
+        qss = _DARK_QSS_MIN if self.is_dark else _LIGHT_QSS_MIN
+        # setStyleSheet re-polishes every widget, so skip it when nothing changed
+        if app.styleSheet() != qss:
+            app.setStyleSheet(qss)
         self.update_theme_icon()
 
     def toggle_theme(self):
@@ -318,31 +466,53 @@ class QuizConverterMain(QMainWindow):
             self.theme_btn.setToolTip("Switch to dark theme")
 
     def show_toast(self, text: str, ms: int = 2000):
+        if self.toast is None:
+            # floating overlay on the central widget (not in the layout), positioned below
+            self.toast = QLabel("", self.centralWidget(), objectName="toast")
+            self.toast.setAlignment(Qt.AlignCenter)
+            # one reusable hide timer; restarting it also keeps an older toast's timeout from hiding a newer one
+            self._toast_timer = QTimer(self)
+            self._toast_timer.setSingleShot(True)
+            self._toast_timer.timeout.connect(self.toast.hide)
         self.toast.setText(text)
+        self.toast.adjustSize()
+        central = self.centralWidget()
+        self.toast.move((central.width() - self.toast.width()) // 2,
+                        central.height() - self.toast.height() - 24)
+        self.toast.raise_()
         self.toast.setVisible(True)
-        QTimer.singleShot(ms, lambda: self.toast.setVisible(False))
+        self._toast_timer.start(ms)
 
     # ---------- File actions ----------
     def browse_file(self):
-        fname, _ = QFileDialog.getOpenFileName(self, "Select input file", str(Path.home()),
-                                              "Text Files (*.txt *.md);;Word Documents (*.docx);;All Files (*)")
-        if not fname:
+        # one dialog per role, created on first use and reused (remembers the last folder)
+        if self._open_dlg is None:
+            self._open_dlg = QFileDialog(self, "Select input file", HOME_STR, OPEN_FILTER)
+            self._open_dlg.setFileMode(QFileDialog.ExistingFile)
+        self._open_dlg.setDirectory(self._last_open_dir)
+        if not self._open_dlg.exec():
             return
-        self.current_input_path = Path(fname)
+        self.current_input_path = Path(self._open_dlg.selectedFiles()[0])
+        self._last_open_dir = str(self.current_input_path.parent)
+        self._suggested_out_name = self.current_input_path.stem + "-converted"
         self.input_edit.setText(self.current_input_path.name)
         # suggest output (no forced .json placeholder)
         if not self.output_edit.text().strip():
-            self.output_edit.setText(self.current_input_path.stem + "-converted")
+            self.output_edit.setText(self._suggested_out_name)
         self.show_toast(f"Loaded: {self.current_input_path.name}", 1400)
 
     def save_as(self):
         default_name = (self.output_edit.text().strip() or
-                        (self.current_input_path.stem + "-converted" if self.current_input_path else "converted-quiz"))
-        fname, _ = QFileDialog.getSaveFileName(self, "Save output as", str(Path.home() / default_name),
-                                              "JSON Files (*.json);;All Files (*)")
-        if not fname:
+                        (self._suggested_out_name if self.current_input_path else "converted-quiz"))
+        if self._save_dlg is None:
+            self._save_dlg = QFileDialog(self, "Save output as", HOME_STR, SAVE_FILTER)
+            self._save_dlg.setAcceptMode(QFileDialog.AcceptSave)
+        self._save_dlg.setDirectory(self._last_save_dir)
+        self._save_dlg.selectFile(default_name)
+        if not self._save_dlg.exec():
             return
-        self.output_path = Path(fname)
+        self.output_path = Path(self._save_dlg.selectedFiles()[0])
+        self._last_save_dir = str(self.output_path.parent)
         # show filename only, like the web mock
         self.output_edit.setText(self.output_path.name)
         self.show_toast("Save location set", 1200)
@@ -357,62 +527,60 @@ class QuizConverterMain(QMainWindow):
         if self.output_path:
             out_path = self.output_path
         else:
-            out_path = self.current_input_path.parent / (out_name_text or (self.current_input_path.stem + "-converted.json"))
-
-        try:
-            text = self.current_input_path.read_text(encoding="utf-8", errors="ignore")
-        except Exception as ex:
-            QMessageBox.critical(self, "Read error", f"Failed to read input file:\n{ex}")
-            return
-
-        # ====== PLUG YOUR BACKEND HERE ======
-        # For now we run a simple parser as a placeholder:
-        parsed = self.simple_convert(text)
-        payload = {
-            "sourceFile": str(self.current_input_path.name),
-            "convertedAt": datetime.utcnow().isoformat() + "Z",
-            "converter": "Quiz Converter (Desktop)",
-            "summary": parsed.get("summary", ""),
-            "data": parsed.get("data")
-        }
-        # ====================================
-
-        try:
-            out_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
-            self.show_toast(f"Converted and saved: {out_path.name}", 1800)
-        except Exception as ex:
-            QMessageBox.critical(self, "Save error", f"Failed to save output file:\n{ex}")
+            out_path = self.current_input_path.parent / (out_name_text or (self._suggested_out_name + ".json"))
+
+        # read / parse / write run on the thread pool so the window stays responsive
+        self.convert_btn.setEnabled(False)
+        worker = ConvertWorker(self.current_input_path, out_path, self.simple_convert)
+        worker.signals.finished.connect(self.on_convert_finished)
+        worker.signals.error.connect(self.on_convert_error)
+        self._convert_worker = worker  # keep the Python wrapper (and its signals) alive while it runs
+        QThreadPool.globalInstance().start(worker)
+
+    def on_convert_finished(self, out_name: str):
+        self._convert_worker = None
+        self.convert_btn.setEnabled(True)
+        self.show_toast(f"Converted and saved: {out_name}", 1800)
+
+    def on_convert_error(self, title: str, message: str):
+        self._convert_worker = None
+        self.convert_btn.setEnabled(True)
+        QMessageBox.critical(self, title, message)
 
     def simple_convert(self, text: str):
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        questions = []
-        i = 0
-        while i < len(lines):
-            l = lines[i]
-            qMatch = re.match(r'^(?:\d+\.|Q:|Question\s*[:\-]?)(.*)$', l, re.IGNORECASE)
-            if qMatch:
-                qtext = qMatch.group(1).strip()
-                i += 1
+        # the token regex only knows '\n' line ends; keep `text` intact for the raw fallback
+        body = text.replace('\r', '\n') if '\r' in text else text
+        # parallel lists while parsing; dicts are only built once at the end
+        q_texts, q_opts, q_answers = [], [], []
+        # the current question and its options are kept as lists of line parts (continuation
+        # lines are appended, not concatenated) and joined once when the question ends
+        qparts = None
+        for m in _TOKEN_RE.finditer(body):
+            kind = m.lastgroup
+            if kind == "q":
+                if qparts is not None:
+                    q_texts.append(' '.join(qparts))
+                    q_opts.append([' '.join(o) for o in options])
+                    q_answers.append(answer)
+                qparts = [m.group("qt").strip()]
                 options = []
                 answer = None
-                while i < len(lines) and not re.match(r'^(?:\d+\.|Q:|Question\s*[:\-]?)', lines[i], re.IGNORECASE):
-                    opt = lines[i]
-                    a = re.match(r'^(?:A\.|B\.|C\.|D\.|[A-D]\)|\-|•)\s*(.*)$', opt, re.IGNORECASE)
-                    ans = re.match(r'^(?:Answer[:\-]?|Ans[:\-]?|Correct[:\-]?)(.*)$', opt, re.IGNORECASE)
-                    if a:
-                        options.append(a.group(1).strip())
-                    elif ans:
-                        answer = ans.group(1).strip()
-                    else:
-                        if options:
-                            options[-1] += ' ' + opt
-                        else:
-                            qtext += ' ' + opt
-                    i += 1
-                questions.append({"question": qtext, "options": options, "answer": answer})
+            elif qparts is None:
+                continue  # text before the first question
+            elif kind == "opt":
+                options.append([m.group("ot").strip()])
+            elif kind == "ans":
+                answer = m.group("at").strip()
+            elif options:
+                options[-1].append(m.group("text").rstrip())
             else:
-                i += 1
-        if questions:
+                qparts.append(m.group("text").rstrip())
+        if qparts is not None:
+            q_texts.append(' '.join(qparts))
+            q_opts.append([' '.join(o) for o in options])
+            q_answers.append(answer)
+        if q_texts:
+            questions = [{"question": t, "options": o, "answer": a} for t, o, a in zip(q_texts, q_opts, q_answers)]
             return {"summary": f"Parsed {len(questions)} question(s)", "data": questions}
         return {"summary": "No structured questions found — packaged raw text", "data": {"raw": text}}
 
@@ -421,16 +589,21 @@ class QuizConverterMain(QMainWindow):
 def main():
     app = QApplication(sys.argv)
     app.setApplicationName("Quiz Converter")
-    # ensure consistent QSS behavior on Windows
+    # IMPORTANT: use Fusion style so QSS reliably applies across Windows versions.
+    # Style and (dark) stylesheet are set exactly once, before the window is built,
+    # so widgets are polished once instead of being re-polished after construction.
     app.setStyle("Fusion")
+    app.setStyleSheet(_DARK_QSS_MIN)
 
     window = QuizConverterMain()
     window.show()
 
-    # center the window
-    screen = app.primaryScreen().availableGeometry()
-    geom = window.geometry()
-    window.move((screen.width() - geom.width()) // 2, (screen.height() - geom.height()) // 2)
+    # center the window once the event loop is running (after the first show)
+    def center_window():
+        screen = app.primaryScreen().availableGeometry()
+        geom = window.geometry()
+        window.move((screen.width() - geom.width()) // 2, (screen.height() - geom.height()) // 2)
+    QTimer.singleShot(0, center_window)
 
     sys.exit(app.exec())
 
@@ -1,10 +1,9 @@
 # quiz_formatter_app_windows_ready_with_gemini.py
 # PySide6 desktop UI with Google Gemini API integration for robust parsing.
-# pip install PySide6 python-docx lxml google-generativeai python-dotenv
+# pip install PySide6 python-docx lxml google-generativeai python-dotenv  (optional: orjson for faster JSON parsing)
 
-import sys, os, json, re
+import sys, os, json, re, sqlite3, hashlib, time, asyncio, copy, functools
 from pathlib import Path
-from docx import Document
 from PySide6.QtCore import Qt, QTimer, QThread, Signal
 from PySide6.QtGui import QFont, QKeySequence, QAction
 from PySide6.QtWidgets import (
@@ -12,102 +11,336 @@ from PySide6.QtWidgets import (
     QHBoxLayout, QVBoxLayout, QFileDialog, QMessageBox, QFrame, QSizePolicy,
     QProgressDialog
 )
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-# Load environment variables from .env file
-load_dotenv()
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# google.generativeai (protobuf/grpc) and python-docx/lxml are imported on first use rather than
+# at startup, so the window can paint before they load.
+@functools.lru_cache(maxsize=1)
+def _get_genai():
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+    # Load environment variables from .env file
+    load_dotenv()
+    return genai
+
+Document = qn = etree = _RUN_TEXT_XPATH = None  # set by _load_docx()
+
+@functools.lru_cache(maxsize=1)
+def _load_docx():
+    global Document, qn, etree, _RUN_TEXT_XPATH
+    from docx import Document
+    from docx.oxml.ns import qn, nsmap
+    from lxml import etree
+    # Text-bearing children of a paragraph's runs, in document order (what python-docx's Run.text reads)
+    _RUN_TEXT_XPATH = etree.XPath("./w:r/*[self::w:t or self::w:tab or self::w:br or self::w:cr"
+                                  " or self::w:noBreakHyphen or self::w:ptab]", namespaces=nsmap)
 
 # --- Gemini API Logic Start ---
+MODEL_NAME = 'gemini-1.5-flash'
+# Bump whenever PROMPT_TEMPLATE or BATCH_PROMPT_TEMPLATE changes so cached responses from the old prompt are not reused
+PROMPT_VERSION = 3
+MAX_CONCURRENT_REQUESTS = 12
+# Blocks packed into one request; the instructions are sent once per batch instead of once per block
+# (explicit context caching is not an option here: CachedContent needs a 32k-token minimum prefix)
+BATCH_SIZE = 12
+PROGRESS_INTERVAL = 0.1  # seconds; progress signals are throttled to about 10 per second
+PROGRESS_LABEL = "Parsed question {}..."
+# Blocks without a '?', option label (a) / A. / A:), question number or answer line are not sent to
+# Gemini; the user is shown what was skipped after export
+_QUESTION_HINT_RE = re.compile(r'\?|\b[a-dA-D][).:]|\b\d+[).]|\bAns', re.IGNORECASE)
+SKIPPED_PREVIEW_CHARS = 60
+
+# The prompt is key to robust parsing
+PROMPT_TEMPLATE = """
+Analyze the following question block and extract the question, four options, the correct answer, and the explanation.
+The correct answer should be a letter (a, b, c, or d). If the options are not labeled, assume the order is a, b, c, d.
+If the answer is not explicitly stated, assume it's the first option.
+Return a JSON array with a single object.
+
+Ensure all text, including special characters and formulas, is preserved exactly as it appears in the input.
+
+Question Block:
+{block_text}
+"""
+
+BATCH_PROMPT_TEMPLATE = """
+Parse each of the following {count} question blocks. For every block, extract the question, four options, the correct answer, and the explanation.
+The correct answer should be a letter (a, b, c, or d). If the options are not labeled, assume the order is a, b, c, d.
+If the answer is not explicitly stated, assume it's the first option.
+
+Return a JSON array of exactly {count} objects, one per block and in the same order as the blocks.
+
+Ensure all text, including special characters and formulas, is preserved exactly as it appears in the input.
+
+Question Blocks (JSON array, in order):
+{blocks_json}
+"""
+
+QUESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question": {"type": "STRING"},
+        "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "answer": {"type": "STRING"},
+        "explanation": {"type": "STRING"},
+    },
+    "required": ["question", "options", "answer", "explanation"],
+}
+# Both prompts answer with an array of question objects; the schema makes Gemini return exactly that shape
+RESPONSE_SCHEMA = {"type": "ARRAY", "items": QUESTION_SCHEMA}
+
+# Parsed Gemini responses keyed by (model, prompt version, block text), so re-converting
+# the same document does not repeat the API calls.
+CACHE_PATH = Path.home() / ".cache" / "quizformatter" / "gemini.sqlite"
+CACHE_COMMIT_EVERY = 16
+
+def open_response_cache():
+    """Open (creating if needed) the response cache. Returns None if it is unavailable."""
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, json TEXT, ts INTEGER)")
+        return conn
+    except (OSError, sqlite3.Error):
+        return None
+
+def response_cache_key(block_text):
+    return hashlib.blake2b(f"{MODEL_NAME}|{PROMPT_VERSION}|{block_text}".encode("utf-8"), digest_size=16).digest()
+
+# A cleanly laid out block (stem, options (a)-(d) one per line, "Ans: x", optional "Exp: ...")
+# is parsed locally; only blocks that don't fit this exactly are sent to Gemini. A number prefix
+# needs whitespace after it ("1.5 kg ..." is a stem) and the answer letter must end the line or be
+# followed by ')' or '.' ("Ans: a lot of ..." is not answer a).
+_LOCAL_BLOCK_RE = re.compile(
+    r'(?:Q(?:uestion)?\s*\d*\s*[:.)]|\d+[.)]\s)?\s*(?P<question>.+?)'
+    r'\n\s*\(?a\)\s*(?P<a>[^\n]+)'
+    r'\n\s*\(?b\)\s*(?P<b>[^\n]+)'
+    r'\n\s*\(?c\)\s*(?P<c>[^\n]+)'
+    r'\n\s*\(?d\)\s*(?P<d>[^\n]+)'
+    r'\n\s*Ans(?:wer)?\s*[:.-]\s*\(?(?P<answer>[a-d])(?:[).][^\n]*|[ \t]*)'
+    r'(?:\n\s*Exp(?:lanation)?\s*[:.-]\s*(?P<explanation>.*))?',
+    re.DOTALL | re.IGNORECASE)
+
+def parse_block_locally(block_text):
+    m = _LOCAL_BLOCK_RE.fullmatch(block_text)
+    if m is None:
+        return None
+    return {
+        "question": m['question'].strip(),
+        "options": [m['a'].strip(), m['b'].strip(), m['c'].strip(), m['d'].strip()],
+        "answer": m['answer'].lower(),
+        "explanation": (m['explanation'] or '').strip(),
+    }
+
+def looks_like_question(block_text):
+    return _QUESTION_HINT_RE.search(block_text) is not None
+
+def block_preview(block_text):
+    line = block_text.split('\n', 1)[0]
+    return line if len(line) <= SKIPPED_PREVIEW_CHARS else line[:SKIPPED_PREVIEW_CHARS - 3] + '...'
+
+@functools.lru_cache(maxsize=1)
+def _generation_config():
+    return _get_genai().types.GenerationConfig(
+        response_mime_type="application/json", response_schema=RESPONSE_SCHEMA)
+
+def _configured_genai():
+    """
+    Configure the SDK for one conversion. Must run at the start of every run(): the SDK keeps its
+    async client process-wide and only configure() drops it, and that client is bound to the
+    event loop of the asyncio.run() that first used it, which is closed once that run ends.
+    """
+    genai = _get_genai()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found. Please set it in a .env file.")
+    genai.configure(api_key=api_key)
+    return genai, _generation_config()
+
 class GeminiParser(QThread):
     # Signals for communication with the main thread
-    parsing_finished = Signal(list, list) # list of questions, list of warnings
+    parsing_finished = Signal(list, list, list) # list of questions, list of warnings, previews of skipped blocks
     parsing_error = Signal(str)
-    progress_updated = Signal(int, str)
+    progress_updated = Signal(int)  # questions parsed so far; the label is formatted on the UI side
+    prep_done = Signal(int)  # number of question blocks, known once the document is read
 
-    def __init__(self, full_text):
+    def __init__(self, input_path):
         super().__init__()
-        self.full_text = full_text
+        self.input_path = input_path
         self.questions = []
         self.warnings = []
+        self.skipped = []
         self._is_running = True
+        self._pending_cache_writes = 0
+        self._cache_failed = False
 
     def run(self):
         try:
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("GOOGLE_API_KEY not found. Please set it in a .env file.")
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            genai, self._generation_config = _configured_genai()
+            model = genai.GenerativeModel(MODEL_NAME)
+
+            # Read the document here, off the UI thread, so large files don't freeze the window
+            _load_docx()
+            doc = Document(self.input_path)
+            # Split the document content by separator for individual processing (runs of '—' leave
+            # empty pieces, which the filter drops, so a plain str.split matches the old r'—+' regex)
+            blocks = [b for b in (s.strip() for s in document_pieces(doc, '—')) if b]
+            kept = []
+            for b in blocks:
+                if looks_like_question(b):
+                    kept.append(b)
+                else:
+                    self.skipped.append(block_preview(b))
+            blocks = kept
+            self.prep_done.emit(len(blocks))
+
+            cache = open_response_cache()
+            try:
+                asyncio.run(self._parse_blocks(model, blocks, cache))
+            finally:
+                if cache is not None:
+                    try:
+                        cache.commit()
+                        cache.close()
+                    except sqlite3.Error:
+                        pass  # the cache is only an optimisation
+            if not self._is_running:
+                return
 
-            # Split the document content by separator for individual processing
-            blocks = re.split(r'—+', self.full_text)
-            
-            # The prompt is key to robust parsing
-            prompt_template = """
-            Analyze the following question block and extract the question, four options, the correct answer, and the explanation.
-            The correct answer should be a letter (a, b, c, or d). If the options are not labeled, assume the order is a, b, c, d.
-            If the answer is not explicitly stated, assume it's the first option.
-            
-            Format the output as a JSON array of a single object, like this:
-            [
-              {{
-                "question": "...",
-                "options": ["...", "...", "...", "..."],
-                "answer": "a",
-                "explanation": "..."
-              }}
-            ]
+            self.parsing_finished.emit(self.questions, self.warnings, self.skipped)
             
-            Ensure all text, including special characters and formulas, is preserved exactly as it appears in the input.
-            
-            Question Block:
-            {block_text}
-            """
-            
-            # Process each block one by one to avoid exceeding token limits for large docs
-            for i, block_text in enumerate(blocks):
+        except Exception as e:
+            self.parsing_error.emit(str(e))
+
+    async def _parse_blocks(self, model, blocks, cache):
+        # Uncached blocks are sent BATCH_SIZE per request, with up to MAX_CONCURRENT_REQUESTS
+        # requests in flight at once.
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        results = [None] * len(blocks)  # (question or None, warnings) per block, kept in document order
+        pending = []
+        for i, block_text in enumerate(blocks):
+            local = parse_block_locally(block_text)
+            if local is not None:
+                results[i] = (local, [])
+                continue
+            data = self._cache_get(cache, block_text)
+            if data is not None:
+                results[i] = self._check_parsed(i, data)
+            else:
+                pending.append((i, block_text))
+        done = sum(r is not None for r in results)
+        last_emit = 0.0
+
+        def report_progress():
+            nonlocal last_emit
+            now = time.monotonic()
+            if now - last_emit >= PROGRESS_INTERVAL or done == len(blocks):
+                last_emit = now
+                self.progress_updated.emit(done)
+
+        if done:
+            report_progress()
+
+        async def parse_batch(batch):
+            nonlocal done
+            async with sem:
                 if not self._is_running:
                     return
-                
-                block_text = block_text.strip()
-                if not block_text:
-                    continue
-
-                self.progress_updated.emit(i + 1, f"Parsing question {i + 1}...")
-
-                prompt = prompt_template.format(block_text=block_text)
-                
-                # Use a try-except block for each API call to handle potential errors
-                try:
-                    response = model.generate_content(prompt, generation_config=genai.types.GenerationConfig(response_mime_type="application/json"))
-                    data = json.loads(response.text)
-                    
-                    if data and isinstance(data, list) and len(data) > 0:
-                        parsed_data = data[0]
-                        
-                        # Add a warning if the answer was assumed
-                        if parsed_data.get('assumed_answer', False):
-                            self.warnings.append(f"Q{i+1}: Answer was not found and was assumed to be 'a'.")
-
-                        # Ensure a complete set of options
-                        if len(parsed_data.get('options', [])) < 4:
-                            self.warnings.append(f"Q{i+1}: Fewer than 4 options were found.")
-                            while len(parsed_data['options']) < 4:
-                                parsed_data['options'].append("")
-                        
-                        self.questions.append(parsed_data)
-                    else:
-                        self.warnings.append(f"Q{i+1}: Failed to parse block. AI returned empty or invalid JSON.")
-
-                except Exception as e:
-                    self.warnings.append(f"Q{i+1}: AI parsing error - {e}")
-
-            self.parsing_finished.emit(self.questions, self.warnings)
-            
+                items = await self._request_batch(model, batch) if len(batch) > 1 else None
+                if items is None:
+                    # Single block, or the batch answer did not line up: parse this batch block by block
+                    for i, block_text in batch:
+                        if not self._is_running:
+                            return
+                        results[i] = await self._request_block(model, i, block_text, cache)
+                else:
+                    for (i, block_text), item in zip(batch, items):
+                        self._cache_put(cache, block_text, json.dumps([item], ensure_ascii=False))
+                        results[i] = self._check_parsed(i, [item])
+            done += len(batch)
+            report_progress()
+
+        await asyncio.gather(*(parse_batch(pending[k:k + BATCH_SIZE]) for k in range(0, len(pending), BATCH_SIZE)))
+
+        for result in results:
+            if result is None:
+                continue
+            parsed_data, warnings = result
+            self.warnings.extend(warnings)
+            if parsed_data is not None:
+                self.questions.append(parsed_data)
+
+    async def _request_batch(self, model, batch):
+        """Parse several blocks with one request. Returns one dict per block, or None on any mismatch."""
+        try:
+            blocks_json = json.dumps([block_text for _, block_text in batch], ensure_ascii=False, indent=0)
+            prompt = BATCH_PROMPT_TEMPLATE.format(count=len(batch), blocks_json=blocks_json)
+            response = await model.generate_content_async(prompt, generation_config=self._generation_config)
+            data = json_loads(response.text)
+        except Exception:
+            return None
+        if isinstance(data, list) and len(data) == len(batch) and all(isinstance(d, dict) for d in data):
+            return data
+        return None
+
+    async def _request_block(self, model, i, block_text, cache):
+        # Use a try-except block for each API call to handle potential errors
+        try:
+            prompt = PROMPT_TEMPLATE.format(block_text=block_text)
+            response = await model.generate_content_async(prompt, generation_config=self._generation_config)
+            data = json_loads(response.text)
+            if data and isinstance(data, list):
+                self._cache_put(cache, block_text, response.text)
+            return self._check_parsed(i, data)
         except Exception as e:
-            self.parsing_error.emit(str(e))
+            return None, [f"Q{i+1}: AI parsing error - {e}"]
+
+    def _check_parsed(self, i, data):
+        warnings = []
+        if data and isinstance(data, list) and len(data) > 0:
+            parsed_data = data[0]
+
+            # Add a warning if the answer was assumed
+            if parsed_data.get('assumed_answer', False):
+                warnings.append(f"Q{i+1}: Answer was not found and was assumed to be 'a'.")
+
+            # Ensure a complete set of options
+            if len(parsed_data.get('options', [])) < 4:
+                warnings.append(f"Q{i+1}: Fewer than 4 options were found.")
+                options = parsed_data.setdefault('options', [])
+                options += [""] * (4 - len(options))
+
+            return parsed_data, warnings
+        warnings.append(f"Q{i+1}: Failed to parse block. AI returned empty or invalid JSON.")
+        return None, warnings
+
+    def _cache_get(self, cache, block_text):
+        if cache is None or self._cache_failed:
+            return None
+        try:
+            row = cache.execute("SELECT json FROM cache WHERE key=?", (response_cache_key(block_text),)).fetchone()
+            return json_loads(row[0]) if row is not None else None
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def _cache_put(self, cache, block_text, json_text):
+        if cache is None or self._cache_failed:
+            return
+        try:
+            cache.execute("INSERT OR REPLACE INTO cache (key, json, ts) VALUES (?, ?, ?)",
+                          (response_cache_key(block_text), json_text, int(time.time())))
+            self._pending_cache_writes += 1
+            if self._pending_cache_writes >= CACHE_COMMIT_EVERY:
+                cache.commit()
+                self._pending_cache_writes = 0
+        except sqlite3.Error:
+            # locked, read-only or out of disk: keep parsing without the cache
+            self._cache_failed = True
 
     def stop(self):
         self._is_running = False
@@ -115,45 +348,122 @@ class GeminiParser(QThread):
 # --- Gemini API Logic End ---
 
 # --- Document I/O Start ---
-def paragraph_full_text(paragraph):
-    # This helper function is still needed to extract raw text
-    return "".join(t.text for t in paragraph.runs).strip()
+# (call _load_docx() before using these)
+
+def paragraph_full_text(p):
+    # Works on the <w:p> element directly; wrapping every paragraph and run in python-docx objects is slow
+    return "".join(str(e) for e in _RUN_TEXT_XPATH(p)).strip()
+
+def document_pieces(doc, sep):
+    """
+    Yield the pieces of the document text (top-level body paragraphs joined by newlines, like
+    doc.paragraphs) split on `sep`, built paragraph by paragraph instead of from one
+    whole-document string.
+    """
+    current = []
+    for i, p in enumerate(doc.element.body.iterchildren(qn('w:p'))):
+        if i:
+            current.append("\n")
+        first, *rest = paragraph_full_text(p).split(sep)
+        current.append(first)
+        for piece in rest:
+            yield "".join(current)
+            current = [piece]
+    yield "".join(current)
+
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+RUN_SPECIAL_RE = re.compile(r'([\t\r\n])')
+
+def _tbl_cell(tr, text, width, span=1):
+    # Same markup python-docx produces for `cell.text = ...` (and `merge` for span > 1)
+    tc = etree.SubElement(tr, qn('w:tc'))
+    tc_pr = etree.SubElement(tc, qn('w:tcPr'))
+    etree.SubElement(tc_pr, qn('w:tcW'), {qn('w:w'): str(width * span), qn('w:type'): 'dxa'})
+    if span > 1:
+        etree.SubElement(tc_pr, qn('w:gridSpan'), {qn('w:val'): str(span)})
+    r = etree.SubElement(etree.SubElement(tc, qn('w:p')), qn('w:r'))
+    _set_run_text(r, text)
+    return r
+
+def _set_run_text(r, text):
+    """Append text to a <w:r> the way python-docx's `run.text = ...` does (tabs, line breaks, xml:space)."""
+    for piece in RUN_SPECIAL_RE.split(text):
+        if not piece:
+            continue
+        if piece == '\t':
+            etree.SubElement(r, qn('w:tab'))
+        elif piece in '\r\n':
+            etree.SubElement(r, qn('w:br'))
+        else:
+            t = etree.SubElement(r, qn('w:t'))
+            t.text = piece
+            if piece != piece.strip():
+                t.set(XML_SPACE, 'preserve')
+
+_TBL_SKELETONS = {}  # col_width -> (<w:tbl> template, positions of the per-question runs)
+
+def _tbl_skeleton(col_width):
+    """The static parts of a question table, built once; per-question cells are left as empty runs."""
+    if col_width not in _TBL_SKELETONS:
+        tbl = etree.Element(qn('w:tbl'))
+        tbl_pr = etree.SubElement(tbl, qn('w:tblPr'))
+        etree.SubElement(tbl_pr, qn('w:tblStyle'), {qn('w:val'): 'TableGrid'})
+        etree.SubElement(tbl_pr, qn('w:tblW'), {qn('w:type'): 'auto', qn('w:w'): '0'})
+        etree.SubElement(tbl_pr, qn('w:tblLook'), {
+            qn('w:firstColumn'): '1', qn('w:firstRow'): '1', qn('w:lastColumn'): '0',
+            qn('w:lastRow'): '0', qn('w:noHBand'): '0', qn('w:noVBand'): '1', qn('w:val'): '04A0'})
+        grid = etree.SubElement(tbl, qn('w:tblGrid'))
+        for _ in range(3):
+            etree.SubElement(grid, qn('w:gridCol'), {qn('w:w'): str(col_width)})
+
+        slots = []
+        # (label, value, mark): None marks a per-question cell, a missing mark means value spans two columns
+        rows = [("Question", None), ("Type", "multiple_choice")]
+        rows += [("Option", None, None)] * 4
+        rows += [("Solution", None), ("Marks", "1", "0")]
+        for label, *cells in rows:
+            tr = etree.SubElement(tbl, qn('w:tr'))
+            _tbl_cell(tr, label, col_width)
+            span = 2 if len(cells) == 1 else 1
+            for text in cells:
+                r = _tbl_cell(tr, text or '', col_width, span)
+                if text is None:
+                    slots.append(r)
+        runs = list(tbl.iter(qn('w:r')))
+        _TBL_SKELETONS[col_width] = (tbl, [runs.index(r) for r in slots])
+    return _TBL_SKELETONS[col_width]
+
+_ANSWER_INDEX = {'a': 0, 'b': 1, 'c': 2, 'd': 3}
+
+def _build_tbl_xml(q, col_width):
+    """One 8x3 question table as a <w:tbl> element."""
+    opts = q.get('options', ['', '', '', ''])
+    # AI returns a letter, so find its index
+    correct_idx = _ANSWER_INDEX.get(q.get('answer', 'a').lower(), 0)
+
+    values = [q.get('question', '')]
+    for i in range(4):
+        values += [opts[i] or "", "correct" if i == correct_idx else "incorrect"]
+    values.append(q.get('explanation', ''))
+
+    template, slots = _tbl_skeleton(col_width)
+    tbl = copy.deepcopy(template)
+    runs = list(tbl.iter(qn('w:r')))
+    for pos, text in zip(slots, values):
+        _set_run_text(runs[pos], text)
+    return tbl
 
 def write_output_docx(questions, output_path):
+    # Tables are built as raw XML; going through python-docx's cell API costs a tree walk per assignment
+    _load_docx()
     doc = Document()
+    section = doc.sections[-1]
+    col_width = int((section.page_width - section.left_margin - section.right_margin) / 3 / 635)  # EMU -> twips
+    body = doc.element.body
+    sect_pr = body.sectPr
     for q in questions:
-        table = doc.add_table(rows=8, cols=3)
-        try:
-            table.style = 'Table Grid'
-        except Exception:
-            pass
-
-        table.cell(0, 0).text = "Question"
-        table.cell(0, 1).merge(table.cell(0, 2)).text = q.get('question', '')
-
-        table.cell(1, 0).text = "Type"
-        table.cell(1, 1).merge(table.cell(1, 2)).text = "multiple_choice"
-
-        opts = q.get('options', ['', '', '', ''])
-        # AI returns a letter, so find its index
-        answer_letter = q.get('answer', 'a').lower()
-        idx_map = {'a': 0, 'b': 1, 'c': 2, 'd': 3}
-        correct_idx = idx_map.get(answer_letter, 0)
-        
-        for i in range(4):
-            r = 2 + i
-            table.cell(r, 0).text = "Option"
-            table.cell(r, 1).text = opts[i] or ""
-            table.cell(r, 2).text = "correct" if i == correct_idx else "incorrect"
-
-        table.cell(6, 0).text = "Solution"
-        table.cell(6, 1).merge(table.cell(6, 2)).text = q.get('explanation', '')
-
-        table.cell(7, 0).text = "Marks"
-        table.cell(7, 1).text = "1"
-        table.cell(7, 2).text = "0"
-        
-        doc.add_paragraph()
+        sect_pr.addprevious(_build_tbl_xml(q, col_width))
+        sect_pr.addprevious(etree.Element(qn('w:p')))
     doc.save(output_path)
 # --- Document I/O End ---
 
@@ -167,6 +477,7 @@ class QuizFormatterMain(QMainWindow):
         self.current_input_path = None
         self.output_path = None
         self.is_dark = True
+        self._applied_dark = None  # theme whose stylesheet is currently installed
         self.parser_thread = None
         
         # --- UI Setup ---
@@ -180,7 +491,7 @@ class QuizFormatterMain(QMainWindow):
         topbar_layout.setContentsMargins(18, 10, 18, 10)
         topbar_layout.setSpacing(8)
         self.app_name = QLabel("QuizFormatter", objectName="app_name")
-        self.app_name.setFont(QFont("Segoe UI", 28, QFont.Weight.Bold))
+        self.app_name.setFont(QFont("Segoe UI", 30, QFont.Weight.DemiBold))
         topbar_layout.addWidget(self.app_name, alignment=Qt.AlignLeft | Qt.AlignVCenter)
         topbar_layout.addStretch()
         self.reset_btn = QPushButton("Reset", objectName="reset_btn")
@@ -277,6 +588,10 @@ class QuizFormatterMain(QMainWindow):
         toast_wrap.addWidget(self.toast)
         toast_wrap.addStretch()
         main_v.addLayout(toast_wrap)
+        # one reusable hide timer; restarting it keeps an older toast's timeout from hiding a newer one
+        self._toast_timer = QTimer(self)
+        self._toast_timer.setSingleShot(True)
+        self._toast_timer.timeout.connect(self.toast.hide)
 
         app = QApplication.instance()
         app.setStyle("Fusion")
@@ -298,8 +613,10 @@ class QuizFormatterMain(QMainWindow):
     def apply_theme(self):
         app = QApplication.instance()
         if app is None: return
-        app.setStyleSheet(DARK_QSS if self.is_dark else LIGHT_QSS)
-        self.app_name.setFont(QFont("Segoe UI", 30, QFont.Weight.DemiBold))
+        # setStyleSheet re-polishes every widget in the app, so only call it when the theme really changed
+        if self._applied_dark != self.is_dark:
+            app.setStyleSheet(DARK_QSS if self.is_dark else LIGHT_QSS)
+            self._applied_dark = self.is_dark
         self.update_theme_icon()
 
     def toggle_theme(self):
@@ -317,7 +634,7 @@ class QuizFormatterMain(QMainWindow):
     def show_toast(self, text: str, ms: int = 2000):
         self.toast.setText(text)
         self.toast.setVisible(True)
-        QTimer.singleShot(ms, lambda: self.toast.setVisible(False))
+        self._toast_timer.start(ms)
 
     def browse_file(self):
         fname, _ = QFileDialog.getOpenFileName(self, "Select input file", str(Path.home()),
@@ -352,15 +669,14 @@ class QuizFormatterMain(QMainWindow):
             out_path = self.current_input_path.parent / (out_name_text or (self.current_input_path.stem + "_Formatted.docx"))
 
         try:
-            doc = Document(self.current_input_path)
-            full_text = "\n".join([paragraph_full_text(p) for p in doc.paragraphs])
-            
-            self.progress_dialog = QProgressDialog("Parsing with AI...", "Cancel", 0, len(re.split(r'—+', full_text)), self)
+            # Busy indicator until the parser thread has read the document and knows the block count
+            self.progress_dialog = QProgressDialog("Reading document...", "Cancel", 0, 0, self)
             self.progress_dialog.setWindowTitle("Converting...")
             self.progress_dialog.setWindowModality(Qt.WindowModal)
             self.progress_dialog.show()
             
-            self.parser_thread = GeminiParser(full_text)
+            self.parser_thread = GeminiParser(self.current_input_path)
+            self.parser_thread.prep_done.connect(self.on_prep_done)
             self.parser_thread.parsing_finished.connect(self.on_parsing_finished)
             self.parser_thread.parsing_error.connect(self.on_parsing_error)
             self.parser_thread.progress_updated.connect(self.on_progress_updated)
@@ -371,11 +687,15 @@ class QuizFormatterMain(QMainWindow):
         except Exception as ex:
             QMessageBox.critical(self, "Error", f"Failed to start conversion:\n{ex}")
     
-    def on_progress_updated(self, value, message):
+    def on_prep_done(self, block_count):
+        self.progress_dialog.setMaximum(block_count)
+        self.progress_dialog.setLabelText("Parsing with AI...")
+
+    def on_progress_updated(self, value):
         self.progress_dialog.setValue(value)
-        self.progress_dialog.setLabelText(message)
+        self.progress_dialog.setLabelText(PROGRESS_LABEL.format(value))
 
-    def on_parsing_finished(self, questions, warnings):
+    def on_parsing_finished(self, questions, warnings, skipped):
         self.progress_dialog.close()
         self.parser_thread = None
         
@@ -392,7 +712,15 @@ class QuizFormatterMain(QMainWindow):
 
         try:
             write_output_docx(questions, self.output_path)
-            self.show_toast(f"Formatted and saved: {self.output_path.name}", 1800)
+            if skipped:
+                # headers and titles land here on most documents, so this is not part of the warnings prompt
+                self.show_toast(f"Formatted and saved: {self.output_path.name} "
+                                f"(skipped {len(skipped)} non-question block(s))", 3000)
+                more = f"\n(and {len(skipped) - 20} more)" if len(skipped) > 20 else ""
+                self.success_label.setToolTip("Skipped (not sent to the AI):\n" + "\n".join(skipped[:20]) + more)
+            else:
+                self.show_toast(f"Formatted and saved: {self.output_path.name}", 1800)
+                self.success_label.setToolTip("")
             self.success_label.setVisible(True)
         except Exception as ex:
             QMessageBox.critical(self, "Save error", f"Failed to save output file:\n{ex}")
@@ -1,135 +1,168 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from docx import Document
-from docx.oxml.ns import qn
-import re
+import os, re, io, copy, zipfile, functools, threading
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
 
 ns = {
     'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
     'm': 'http://schemas.openxmlformats.org/officeDocument/2006/math'
 }
 
+# python-docx is imported in convert() so the window opens without waiting on it;
+# this is its qn() for the two prefixes used here.
+def qn(tag):
+    prefix, tagroot = tag.split(':')
+    return '{%s}%s' % (ns[prefix], tagroot)
+
+M_E, M_SUP, M_SUB, M_NUM, M_DEN, M_DEG = (qn('m:' + t) for t in ('e', 'sup', 'sub', 'num', 'den', 'deg'))
+
 def omml_to_text(elem):
-    tag_name = elem.tag.split('}')[-1]
-    if tag_name == 't':
-        return elem.text or ''
-    elif tag_name == 'sSup':
-        base_elem = elem.find(qn('m:e'), namespaces=ns)
-        sup_elem = elem.find(qn('m:sup'), namespaces=ns)
-        base = omml_to_text(base_elem) if base_elem is not None else ''
-        sup = omml_to_text(sup_elem) if sup_elem is not None else ''
-        return base + '^' + sup
-    elif tag_name == 'sSub':
-        base_elem = elem.find(qn('m:e'), namespaces=ns)
-        sub_elem = elem.find(qn('m:sub'), namespaces=ns)
-        base = omml_to_text(base_elem) if base_elem is not None else ''
-        sub = omml_to_text(sub_elem) if sub_elem is not None else ''
-        return base + '_' + sub
-    elif tag_name == 'sSubSup':
-        base_elem = elem.find(qn('m:e'), namespaces=ns)
-        sub_elem = elem.find(qn('m:sub'), namespaces=ns)
-        sup_elem = elem.find(qn('m:sup'), namespaces=ns)
-        base = omml_to_text(base_elem) if base_elem is not None else ''
-        sub = omml_to_text(sub_elem) if sub_elem is not None else ''
-        sup = omml_to_text(sup_elem) if sup_elem is not None else ''
-        return base + '_' + sub + '^' + sup
-    elif tag_name == 'frac':
-        num_elem = elem.find(qn('m:num'), namespaces=ns)
-        den_elem = elem.find(qn('m:den'), namespaces=ns)
-        num = omml_to_text(num_elem) if num_elem is not None else ''
-        den = omml_to_text(den_elem) if den_elem is not None else ''
-        return '(' + num + '/' + den + ')'
-    elif tag_name == 'rad':
-        deg_elem = elem.find(qn('m:deg'), namespaces=ns)
-        base_elem = elem.find(qn('m:e'), namespaces=ns)
-        deg = omml_to_text(deg_elem) if deg_elem is not None else ''
-        base = omml_to_text(base_elem) if base_elem is not None else ''
-        if deg:
-            return 'root^' + deg + '(' + base + ')'
-        else:
-            return '√(' + base + ')'
-    elif tag_name == 'd':
-        base_elem = elem.find(qn('m:e'), namespaces=ns)
-        base = omml_to_text(base_elem) if base_elem is not None else ''
-        return '(' + base + ')'
-    elif tag_name == 'r':
-        return ''.join(omml_to_text(child) for child in elem)
-    else:
-        return ''.join(omml_to_text(child) for child in elem if child is not None)
+    return OMML_HANDLER_FOR_TAG[elem.tag](elem)
+
+def _part_text(elem):
+    return omml_to_text(elem) if elem is not None else ''
+
+def _children_text(elem):
+    return ''.join(OMML_HANDLER_FOR_TAG[child.tag](child) for child in elem)
+
+def _rad_text(elem):
+    deg = _part_text(elem.find(M_DEG))
+    base = _part_text(elem.find(M_E))
+    if deg:
+        return 'root^' + deg + '(' + base + ')'
+    return '√(' + base + ')'
+
+# Handlers by local name (any namespace, e.g. a w:t inside a math run is read as text too)
+OMML_HANDLERS = {
+    't': lambda elem: elem.text or '',
+    'sSup': lambda elem: _part_text(elem.find(M_E)) + '^' + _part_text(elem.find(M_SUP)),
+    'sSub': lambda elem: _part_text(elem.find(M_E)) + '_' + _part_text(elem.find(M_SUB)),
+    'sSubSup': lambda elem: (_part_text(elem.find(M_E)) + '_' + _part_text(elem.find(M_SUB))
+                             + '^' + _part_text(elem.find(M_SUP))),
+    'frac': lambda elem: '(' + _part_text(elem.find(M_NUM)) + '/' + _part_text(elem.find(M_DEN)) + ')',
+    'rad': _rad_text,
+    'd': lambda elem: '(' + _part_text(elem.find(M_E)) + ')',
+}
+
+class _HandlerByTag(dict):
+    """Full tag -> handler, resolved from the local name the first time each tag is seen."""
+    def __missing__(self, tag):
+        handler = self[tag] = OMML_HANDLERS.get(tag.split('}')[-1], _children_text)
+        return handler
 
-def get_para_text(para):
+OMML_HANDLER_FOR_TAG = _HandlerByTag()
+
+W_P = qn('w:p')
+M_OMATH = qn('m:oMath')
+# First <w:t> of each direct run, and each direct math object, in document order
+PARA_TEXT_XPATH = etree.XPath('./w:r/w:t[1] | ./m:oMath', namespaces=ns)
+
+def get_para_text(p):
+    """Text of a <w:p> element, with inline math flattened by omml_to_text."""
     parts = []
-    for child in para._element.iterchildren():
-        if child.tag == qn('w:r'):
-            t = child.find(qn('w:t'))
-            if t is not None:
-                parts.append(t.text or '')
-        elif child.tag == qn('m:oMath'):
-            math_text = omml_to_text(child)
-            parts.append(math_text)
+    for node in PARA_TEXT_XPATH(p):
+        if node.tag == M_OMATH:
+            parts.append(omml_to_text(node))
+        else:
+            parts.append(node.text or '')
     return ''.join(parts)
 
+# Patterns used by process_block and convert, compiled once
+OPTIONS_RE = re.compile(r'Options:\s*(.*)', re.DOTALL | re.IGNORECASE)
+QNUM_BOLD_RE = re.compile(r'^\d+\.\s*\*\*(.*)\*\*')
+QNUM_TEXT_RE = re.compile(r'^\d+\.\s*(.*)')
+OPTION_LABEL_RE = re.compile(r'\(([a-d])\)\s*', re.IGNORECASE)
+ANSWER_RE = re.compile(r'(?:\*\*Answer:\*\*|Answer:)\s*\(([a-d])\)\s*(.*)', re.IGNORECASE)
+EXPL_LABEL_RE = re.compile(r'(?:\*\*Explanation:\*\*|Explanation:)\s*', re.IGNORECASE)
+SEPARATOR_CHARS = '\u002d\u2013\u2014\u2015'  # a line of only these (or a blank line) ends a block
+QNUM_RE = re.compile(r'^\d+\.')
+LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+
+# process_block is cheap per block, so worker start-up (a module re-import per process on
+# Windows) only pays off for very large documents
+PARALLEL_MIN_BLOCKS = 20000
+
+def is_question_start(line):
+    """True for a '<number>.' line. Most lines fail the first-character test, which skips the regex."""
+    return line[:1].isdecimal() and QNUM_RE.match(line) is not None
+
 def process_block(block_lines):
+    # cheapest rejections first: the question line has to start with its number
+    if not block_lines or not block_lines[0].lstrip()[:1].isdecimal():
+        return None
     block_text = '\n'.join(block_lines)
     if 'Answer:' not in block_text or 'Options:' not in block_text:
         return None
 
     # Find question part
     question_line = block_lines[0]
-    opts_match = re.search(r'Options:\s*(.*)', question_line, re.DOTALL | re.IGNORECASE)
+    opts_match = OPTIONS_RE.search(question_line)
     if opts_match:
         question_part = question_line[:opts_match.start()].strip()
         opts_part = opts_match.group(1).strip()
     else:
         question_part = question_line.strip()
         opts_part = None
-        for j in range(1, len(block_lines)):
-            if 'Options:' in block_lines[j]:
-                opts_part = block_lines[j].split('Options:')[1].strip()
+        for line in block_lines[1:]:
+            _, sep, after = line.partition('Options:')
+            if sep:
+                # up to any second 'Options:', as split('Options:')[1] gave
+                opts_part = after.partition('Options:')[0].strip()
                 break
         if opts_part is None:
             return None
+    # every option label is '(x)'; an empty or label-less tail has no options to tokenize
+    if '(' not in opts_part:
+        return None
 
     # Extract question, handling ** or not
-    q_match = re.match(r'^\d+\.\s*\*\*(.*)\*\*', question_part)
+    q_match = QNUM_BOLD_RE.match(question_part)
     if q_match:
         question = q_match.group(1).strip()
     else:
-        q_match = re.match(r'^\d+\.\s*(.*)', question_part)
+        q_match = QNUM_TEXT_RE.match(question_part)
         if q_match:
             question = q_match.group(1).strip()
         else:
             return None
 
     # Options
-    option_texts = re.findall(r'\(([a-d])\)\s*(.+?)(?=\s*\([a-d]\)|$)', opts_part, re.DOTALL | re.IGNORECASE)
+    # One forward pass over the labels; each option is the slice up to the next label.
+    labels = list(OPTION_LABEL_RE.finditer(opts_part))
     options = ['', '', '', '']
-    for letter, text in option_texts:
-        idx = ord(letter.lower()) - ord('a')
-        if 0 <= idx < 4:
-            options[idx] = text.strip().replace('\n', ' ').strip()
+    i = 0
+    while i < len(labels):
+        m = labels[i]
+        i += 1
+        if m.end(1) + 1 == len(opts_part):
+            continue  # bare label at the very end
+        start = m.end()
+        # option text is at least one character, so a label right at `start` belongs to it
+        while i < len(labels) and labels[i].start() <= start:
+            i += 1
+        end = labels[i].start() if i < len(labels) else len(opts_part)
+        options[ord(m.group(1).lower()) - ord('a')] = opts_part[start:end].strip().replace('\n', ' ').strip()
 
     if not any(options):
         return None
 
     # Answer
-    try:
-        ans_line = next(l for l in block_lines if '**Answer:**' in l or 'Answer:' in l)
-    except StopIteration:
+    # ('**Answer:**' contains 'Answer:', so one substring test covers both forms)
+    ans_index, ans_line = next(((i, l) for i, l in enumerate(block_lines) if 'Answer:' in l), (None, None))
+    if ans_line is None:
         return None
-    ans_match = re.search(r'\*\*Answer:\*\*\s*\(([a-d])\)\s*(.*)', ans_line, re.IGNORECASE)
-    if not ans_match:
-        ans_match = re.search(r'Answer:\s*\(([a-d])\)\s*(.*)', ans_line, re.IGNORECASE)
+    ans_match = ANSWER_RE.search(ans_line)
     if not ans_match:
         return None
     ans_letter = ans_match.group(1).lower()
 
     # Explanation
-    exp_index = block_lines.index(ans_line) + 1
-    exp_lines = [line.strip() for line in block_lines[exp_index:] if line.strip()]
+    exp_lines = [s for line in block_lines[ans_index + 1:] if (s := line.strip())]
     exp = ' '.join(exp_lines)
-    exp = re.sub(r'\*\*Explanation:\*\*\s*', '', exp, flags=re.IGNORECASE)
-    exp = re.sub(r'Explanation:\s*', '', exp, flags=re.IGNORECASE).strip()
+    # labels are removed wherever they occur, not just at the start; every label has a ':'
+    if ':' in exp:
+        exp = EXPL_LABEL_RE.sub('', exp).strip()
 
     return {
         'question': question,
@@ -138,6 +171,113 @@ def process_block(block_lines):
         'explanation': exp
     }
 
+RUN_SPECIAL_RE = re.compile(r'([\t\r\n])')
+
+W_R, W_T, W_TAB, W_BR = (qn('w:' + t) for t in ('r', 't', 'tab', 'br'))
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+def append_run_text(r, text):
+    """Append `text` to a <w:r> the way python-docx's run.text setter does (tabs, line breaks, xml:space)."""
+    for piece in RUN_SPECIAL_RE.split(text):
+        if piece == '\t':
+            etree.SubElement(r, W_TAB)
+        elif piece in ('\r', '\n'):
+            etree.SubElement(r, W_BR)
+        elif piece:
+            t = etree.SubElement(r, W_T)
+            t.text = piece
+            if piece != piece.strip():
+                t.set(XML_SPACE, 'preserve')
+
+TABLE_TEMPLATE = None  # (empty <w:tbl>, positions of the per-question runs); built on first use
+
+def table_template(doc):
+    """
+    Lay the question table out once with python-docx (style, widths, merged cells), leaving the
+    per-question cells empty. Each question then deep-copies it and fills those runs.
+    """
+    global TABLE_TEMPLATE
+    if TABLE_TEMPLATE is None:
+        table = doc.add_table(rows=8, cols=3)
+        table.style = 'Table Grid'
+        rows = table.rows
+        slots = []
+        # Row 0: Question
+        rows[0].cells[0].text = 'Question'
+        slots.append(rows[0].cells[1].merge(rows[0].cells[2]))
+        # Row 1: Type
+        rows[1].cells[0].text = 'Type'
+        rows[1].cells[1].merge(rows[1].cells[2]).text = 'multiple_choice'
+        # Rows 2-5: Options (text, correct/incorrect)
+        for r in range(2, 6):
+            rows[r].cells[0].text = 'Option'
+            slots += [rows[r].cells[1], rows[r].cells[2]]
+        # Row 6: Solution
+        rows[6].cells[0].text = 'Solution'
+        slots.append(rows[6].cells[1].merge(rows[6].cells[2]))
+        # Row 7: Marks
+        rows[7].cells[0].text = 'Marks'
+        rows[7].cells[1].text = '1'
+        rows[7].cells[2].text = '0'
+        for cell in slots:
+            cell.text = ''  # leaves one empty run to fill per question
+        tbl = table._tbl
+        tbl.getparent().remove(tbl)
+        runs = list(tbl.iter(W_R))
+        TABLE_TEMPLATE = (tbl, [runs.index(cell._tc.p_lst[0].r_lst[0]) for cell in slots])
+    return TABLE_TEMPLATE
+
+def question_table(q, template, slots):
+    ans_idx = ord(q['ans_letter']) - ord('a')
+    values = [q['question']]
+    for idx, opt in enumerate(q['options']):
+        values += [opt, 'correct' if idx == ans_idx else 'incorrect']
+    # Solution: the first line fills the cell's paragraph, further non-blank lines get their own
+    exp_parts = LINE_BREAK_RE.split(q['explanation'])
+    values.append(exp_parts[0])
+
+    tbl = copy.deepcopy(template)
+    runs = list(tbl.iter(W_R))
+    for pos, text in zip(slots, values):
+        append_run_text(runs[pos], text)
+    solution_tc = runs[slots[-1]].getparent().getparent()
+    for part in exp_parts[1:]:
+        if part and not part.isspace():
+            append_run_text(etree.SubElement(etree.SubElement(solution_tc, W_P), W_R), part)
+    return tbl
+
+def write_output_docx(questions, output_path):
+    """
+    Write one table (and a spacer paragraph) per question. word/document.xml is streamed
+    table by table with etree.xmlfile, so the output document is never held in memory;
+    every other part is copied from python-docx's default template.
+    """
+    from docx import Document
+    base_doc = Document()
+    template, slots = table_template(base_doc)
+    document = base_doc.element
+    body = document.body
+    sect_pr = body.sectPr
+    spacer = etree.Element(W_P, nsmap={'w': ns['w']})
+    base = io.BytesIO()
+    base_doc.save(base)
+    with zipfile.ZipFile(base) as zin, zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            if item.filename != 'word/document.xml':
+                zout.writestr(item, zin.read(item.filename))
+                continue
+            with zout.open(item, 'w') as f, etree.xmlfile(f, encoding='UTF-8') as xf:
+                xf.write_declaration(standalone=True)
+                with xf.element(document.tag, document.attrib, nsmap=document.nsmap):
+                    with xf.element(body.tag, body.attrib):
+                        for child in body:
+                            if child is not sect_pr:
+                                xf.write(child)
+                        for q in questions:
+                            xf.write(question_table(q, template, slots))
+                            xf.write(spacer)
+                        xf.write(sect_pr)
+
 def browse_input():
     path = filedialog.askopenfilename(filetypes=[("Word files", "*.docx")])
     if path:
@@ -148,102 +288,97 @@ def browse_output():
     if path:
         output_var.set(path)
 
+def parse_questions(input_path):
+    from docx import Document
+    doc = Document(input_path)
+    lines = []
+    # top-level body paragraphs (what doc.paragraphs lists), without a Paragraph wrapper each
+    for p in doc.element.body.iterchildren(W_P):
+        text = get_para_text(p)
+        if text and not text.isspace():
+            lines.append(text)
+    blocks = []  # joined lines of each question block, in document order
+
+    def add_block(block):
+        blocks.append(tuple(' '.join(parts) for parts in block))
+
+    # each block line is kept as [line, continuation, ...] and joined once when the block is parsed
+    current_block = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped.strip(SEPARATOR_CHARS):
+            if current_block and is_question_start(current_block[0][0]):
+                add_block(current_block)
+            current_block = []
+        else:
+            if is_question_start(stripped):
+                if current_block:
+                    add_block(current_block)
+                current_block = [[line]]
+            elif current_block:
+                current_block[-1].append(line)  # Append to last if continuation
+            else:
+                # Skip headers
+                pass
+    if current_block:
+        add_block(current_block)
+    # repeated (templated) blocks are parsed once; the writer only reads the shared dicts
+    unique_blocks = list(dict.fromkeys(blocks))
+    if len(unique_blocks) >= PARALLEL_MIN_BLOCKS:
+        with ProcessPoolExecutor() as ex:
+            results = list(ex.map(process_block, map(list, unique_blocks), chunksize=256))
+    else:
+        results = [process_block(list(b)) for b in unique_blocks]
+    parsed_blocks = dict(zip(unique_blocks, results))
+    return tuple(q for q in map(parsed_blocks.get, blocks) if q)
+
+# Re-converting the same file (e.g. to a different output) reuses the parse while the file is unchanged
+@functools.lru_cache(maxsize=8)
+def _parse_cached(path, mtime_ns, size):
+    return parse_questions(path)
+
 def convert():
     input_path = input_var.get()
     output_path = output_var.get()
     if not input_path or not output_path:
         messagebox.showerror("Error", "Please select input and output files.")
         return
+    # parse and write off the Tk thread so the window keeps repainting on large files
+    convert_btn.config(state=tk.DISABLED)
+    threading.Thread(target=run_conversion, args=(input_path, output_path), daemon=True).start()
+
+def run_conversion(input_path, output_path):
     try:
-        doc = Document(input_path)
-        lines = []
-        for p in doc.paragraphs:
-            text = get_para_text(p)
-            if text.strip():
-                lines.append(text)
-        questions = []
-        current_block = []
-        for line in lines:
-            stripped = line.strip()
-            if re.match(r'^[\u002d\u2013\u2014\u2015]+$', stripped) or stripped == '':
-                if current_block and re.match(r'^\d+\.', current_block[0]):
-                    q = process_block(current_block)
-                    if q:
-                        questions.append(q)
-                current_block = []
-            else:
-                if re.match(r'^\d+\.', stripped):
-                    if current_block:
-                        q = process_block(current_block)
-                        if q:
-                            questions.append(q)
-                    current_block = [line]
-                elif current_block:
-                    current_block[-1] += ' ' + line  # Append to last if continuation
-                else:
-                    # Skip headers
-                    pass
-        if current_block:
-            q = process_block(current_block)
-            if q:
-                questions.append(q)
+        st = os.stat(input_path)
+        questions = _parse_cached(os.path.abspath(input_path), st.st_mtime_ns, st.st_size)
         if not questions:
-            messagebox.showwarning("Warning", "No questions found in the document.")
+            root.after(0, conversion_done, messagebox.showwarning, "Warning", "No questions found in the document.")
             return
-        out_doc = Document()
-        for q in questions:
-            table = out_doc.add_table(rows=8, cols=3)
-            table.style = 'Table Grid'
-            rows = table.rows
-            # Row 0: Question
-            rows[0].cells[0].text = 'Question'
-            merged = rows[0].cells[1].merge(rows[0].cells[2])
-            merged.text = q['question']
-            # Row 1: Type
-            rows[1].cells[0].text = 'Type'
-            merged = rows[1].cells[1].merge(rows[1].cells[2])
-            merged.text = 'multiple_choice'
-            # Rows 2-5: Options
-            for idx, opt in enumerate(q['options']):
-                r = idx + 2
-                rows[r].cells[0].text = 'Option'
-                rows[r].cells[1].text = opt
-                correct = 'correct' if chr(ord('a') + idx) == q['ans_letter'] else 'incorrect'
-                rows[r].cells[2].text = correct
-            # Row 6: Solution
-            rows[6].cells[0].text = 'Solution'
-            merged = rows[6].cells[1].merge(rows[6].cells[2])
-            exp_parts = re.split(r'\s*\n\s*', q['explanation'])
-            if exp_parts:
-                p = merged.paragraphs[0]
-                p.text = exp_parts[0]
-                for part in exp_parts[1:]:
-                    if part.strip():
-                        merged.add_paragraph(part)
-            # Row 7: Marks
-            rows[7].cells[0].text = 'Marks'
-            rows[7].cells[1].text = '1'
-            rows[7].cells[2].text = '0'
-            out_doc.add_paragraph('')
-        out_doc.save(output_path)
-        messagebox.showinfo("Success", f"Conversion completed. Processed {len(questions)} questions.")
+        write_output_docx(questions, output_path)
+        root.after(0, conversion_done, messagebox.showinfo, "Success", f"Conversion completed. Processed {len(questions)} questions.")
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        root.after(0, conversion_done, messagebox.showerror, "Error", f"An error occurred: {str(e)}")
+
+def conversion_done(show, title, message):
+    convert_btn.config(state=tk.NORMAL)
+    show(title, message)
 
-root = tk.Tk()
-root.title("DOCX Question Converter")
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.title("DOCX Question Converter")
 
-input_var = tk.StringVar()
-output_var = tk.StringVar()
+    input_var = tk.StringVar()
+    output_var = tk.StringVar()
 
-tk.Label(root, text="Input File:").grid(row=0, column=0, padx=10, pady=5)
-tk.Entry(root, textvariable=input_var, width=50).grid(row=0, column=1, padx=10, pady=5)
-tk.Button(root, text="Browse", command=browse_input).grid(row=0, column=2, padx=10, pady=5)
+    tk.Label(root, text="Input File:").grid(row=0, column=0, padx=10, pady=5)
+    tk.Entry(root, textvariable=input_var, width=50).grid(row=0, column=1, padx=10, pady=5)
+    tk.Button(root, text="Browse", command=browse_input).grid(row=0, column=2, padx=10, pady=5)
 
-tk.Label(root, text="Output File:").grid(row=1, column=0, padx=10, pady=5)
-tk.Entry(root, textvariable=output_var, width=50).grid(row=1, column=1, padx=10, pady=5)
-tk.Button(root, text="Browse", command=browse_output).grid(row=1, column=2, padx=10, pady=5)
+    tk.Label(root, text="Output File:").grid(row=1, column=0, padx=10, pady=5)
+    tk.Entry(root, textvariable=output_var, width=50).grid(row=1, column=1, padx=10, pady=5)
+    tk.Button(root, text="Browse", command=browse_output).grid(row=1, column=2, padx=10, pady=5)
 
-tk.Button(root, text="Convert", command=convert).grid(row=2, column=1, pady=20)
+    convert_btn = tk.Button(root, text="Convert", command=convert)
+    convert_btn.grid(row=2, column=1, pady=20)
 
-root.mainloop()
\ No newline at end of file
+    root.mainloop()
\ No newline at end of file